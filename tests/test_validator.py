@@ -1,151 +1,250 @@
 import unittest
+from unittest import mock
+import contextlib
+from collections import OrderedDict
+import io
+import json
 from pathlib import Path
 import tempfile
 import os
-import sys
+import shutil
+import yaml
+from workflow_validate import validator as validator_module
 from workflow_validate.validator import YAMLValidator, main, ValidationResult
 
+# Canonical valid workflow; tests derive variants with dict(BASE, **overrides)
+BASE = {'name': 'Test', 'on': 'push', 'jobs': {'build': {'runs-on': 'ubuntu-latest', 'steps': [{'run': 'echo hello'}]}}}
+BASE_YAML = yaml.safe_dump(BASE)
+BUILD = BASE['jobs']['build']
+
+# (expected error type, workflow variant) for Phase 2 schema errors
+ERROR_CASES = [
+    ('MissingOn', {key: value for key, value in BASE.items() if key != 'on'}),
+    ('InvalidOn', dict(BASE, on=42)),
+    ('MissingJobs', {key: value for key, value in BASE.items() if key != 'jobs'}),
+    ('InvalidJobs', dict(BASE, jobs=['build'])),
+    ('MissingRunsOn', dict(BASE, jobs={'build': {'steps': BUILD['steps']}})),
+    ('InvalidStep', dict(BASE, jobs={'build': dict(BUILD, steps=[{'name': 'no-op'}])})),
+    ('InvalidPermissionsType', dict(BASE, permissions='invalid')),
+    ('InvalidPermissionsType', dict(BASE, permissions=['contents'])),
+    ('InvalidScope', dict(BASE, permissions={'bogus': 'read'})),
+    ('InvalidLevel', dict(BASE, jobs={'build': dict(BUILD, permissions={'contents': 'admin'})})),
+    ('InvalidStrategy', dict(BASE, jobs={'build': dict(BUILD, strategy='fast')})),
+    ('InvalidMatrixVariants', dict(BASE, jobs={'build': dict(BUILD, strategy={'matrix': {'py': [3.11, {}]}})})),
+    ('InvalidEnv', dict(BASE, env=['A=1'])),
+]
+
+def finding_types(findings: list) -> frozenset[str]:
+    """Set of 'type' values in a result's errors or warnings, built once per assertion block."""
+    return frozenset(finding['type'] for finding in findings)
+
 class TestYAMLValidator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.validator = YAMLValidator()  # Shared; results are fresh dicts per call
+        # One tmpfs-backed scratch dir for the whole class, removed in a single rmtree
+        cls._tmpdir = tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._tmpdir, ignore_errors=True)
+
     def setUp(self):
-        self.validator = YAMLValidator()
+        self.validator._cache.clear()  # Only per-instance state; keeps cache assertions test-local
 
-    def create_temp_yaml(self, content: str) -> Path:
-        with tempfile.NamedTemporaryFile(suffix='.yml', delete=False) as tmp:
+    def create_temp_yaml(self, content: str) -> str:
+        with tempfile.NamedTemporaryFile(suffix='.yml', dir=self._tmpdir, delete=False) as tmp:
             tmp.write(content.encode('utf-8'))
-            return Path(tmp.name)
+            return tmp.name
 
-    def tearDown(self):
-        # Clean up any temp files if needed
-        pass
+    def create_temp_dir(self) -> Path:
+        return Path(tempfile.mkdtemp(dir=self._tmpdir))
 
     def test_valid_workflow(self):
+        result: ValidationResult = self.validator.validate_string(BASE_YAML)
+        self.assertTrue(result['valid'])
+        self.assertEqual(len(result['errors']), 0)
+        self.assertEqual(len(result['warnings']), 0)
+        self.assertTrue(result['structure']['has_name'])
+        self.assertTrue(result['structure']['has_on'])
+        self.assertTrue(result['structure']['has_jobs'])
+        self.assertEqual(result['structure']['job_count'], 1)
+        self.assertEqual(result['structure']['jobs'], ['build'])
+        self.assertEqual(result['structure']['triggers'], ['push'])
+
+    def test_validate_file_matches_string(self):
+        content = "name: Test\non: push\njobs:\n  build:\n    runs-on: ubuntu-latest\t\n"
+        tmp_path = self.create_temp_yaml(content)
+        self.assertEqual(self.validator.validate_file(tmp_path), self.validator.validate_string(content))
+
+    def test_validate_stream_and_bytes(self):
+        content = BASE_YAML.encode('utf-8')
+        self.assertEqual(self.validator.validate_stream(io.BytesIO(content)), self.validator.validate_bytes(content))
+        stdin = io.TextIOWrapper(io.BytesIO(b'name: Test\njobs: {}\n'))
+        with mock.patch('sys.stdin', stdin), contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(['-']), 1)
+
+    @unittest.skipUnless(yaml.__with_libyaml__, "PyYAML built without libyaml")
+    def test_loader_uses_libyaml(self):
+        self.assertTrue(issubclass(validator_module._workflow_loader(), yaml.CSafeLoader))
+
+    def test_result_cache(self):
+        first = self.validator.validate_string(BASE_YAML)
+        first['errors'].append({'line': 0, 'type': 'Injected', 'message': '', 'severity': 'ERROR'})
+        self.assertEqual(self.validator.validate_string(BASE_YAML)['errors'], [])  # Hits return copies
+        for i in range(validator_module._CACHE_MAXSIZE + 5):
+            self.validator.validate_string(yaml.safe_dump(dict(BASE, name=f'wf{i}')), phase='schema')
+        self.assertEqual(len(self.validator._cache), validator_module._CACHE_MAXSIZE)
+
+    def test_invalid_syntax(self):
         content = """
-name: Test Workflow
+name: Test
 on: push
 jobs:
   build:
     runs-on: ubuntu-latest
     steps:
       - run: echo hello
+invalid_indent
 """
-        tmp_path = self.create_temp_yaml(content)
-        try:
-            result: ValidationResult = self.validator.validate_file(tmp_path)
-            self.assertTrue(result['valid'])
-            self.assertEqual(len(result['errors']), 0)
-            self.assertEqual(len(result['warnings']), 0)
-            self.assertTrue(result['structure']['has_name'])
-            self.assertTrue(result['structure']['has_on'])
-            self.assertTrue(result['structure']['has_jobs'])
-            self.assertEqual(result['structure']['job_count'], 1)
-            self.assertEqual(result['structure']['jobs'], ['build'])
-            self.assertEqual(result['structure']['triggers'], ['push'])
-        finally:
-            os.unlink(tmp_path)
+        result = self.validator.validate_string(content)
+        self.assertFalse(result['valid'])
+        self.assertGreater(len(result['errors']), 0)
+        self.assertEqual(result['errors'][0]['type'], 'YAMLSyntaxError')
 
-    def test_invalid_syntax(self):
+    def test_duplicate_key_is_syntax_error(self):
         content = """
 name: Test
 on: push
+permissions:
+  contents: read
+  contents: write
 jobs:
   build:
     runs-on: ubuntu-latest
     steps:
       - run: echo hello
-invalid_indent
 """
-        tmp_path = self.create_temp_yaml(content)
-        try:
-            result = self.validator.validate_file(tmp_path)
-            self.assertFalse(result['valid'])
-            self.assertGreater(len(result['errors']), 0)
-            self.assertEqual(result['errors'][0]['type'], 'YAMLSyntaxError')
-        finally:
-            os.unlink(tmp_path)
-
-    def test_missing_on(self):
+        result = self.validator.validate_string(content)
+        self.assertFalse(result['valid'])
+        self.assertEqual(result['errors'][0]['type'], 'YAMLSyntaxError')
+        self.assertEqual(result['errors'][0]['line'], 6)
+
+    def test_yaml_12_scalars(self):
+        result = self.validator.validate_string(BASE_YAML + 'env: {SEP: =}\n')
+        self.assertTrue(result['valid'])
+        loader = validator_module._workflow_loader()
+        scalars = yaml.load('[=, 010, 0o10, 0x1F, 1_000, "1:30", 1:30, yes, on, true, .5]', Loader=loader)
+        self.assertEqual(scalars, ['=', 10, 8, 31, 1000, '1:30', '1:30', 'yes', 'on', True, 0.5])
+        digitless = ['-_', '+_', '0x_', '0b_', '0o_', '._']
+        self.assertEqual(yaml.load(f"[{', '.join(digitless)}]", Loader=loader), digitless)
+        self.assertEqual(yaml.load('[0x_1, 0o_7, -1_0, ._5]', Loader=loader), [1, 7, -10, 0.5])
+        content = BASE_YAML.replace('runs-on:', 'strategy: {max-parallel: -_}\n    runs-on:')
+        self.assertIn('InvalidMaxParallel', finding_types(self.validator.validate_string(content)['errors']))
+
+    def test_validate_dict_matches_string(self):
+        self.assertEqual(self.validator.validate_dict(BASE), self.validator.validate_string(BASE_YAML, phase='schema'))
+
+    def test_error_cases(self):
+        for expected_type, data in ERROR_CASES:
+            with self.subTest(expected_type, data=data):
+                result = self.validator.validate_dict(data)
+                self.assertFalse(result['valid'])
+                self.assertIn(expected_type, finding_types(result['errors']))
+
+    def test_validate_dict_accepts_subclasses(self):
+        class Version(str):
+            pass
+        matrix = {'py': [Version('3.11')], 'include': [OrderedDict(py='3.12')]}
+        data = dict(BASE, jobs={'build': dict(BUILD, strategy={'matrix': matrix})})
+        self.assertTrue(self.validator.validate_dict(data)['valid'])
+
+    def test_null_job_id_is_scoped_to_job(self):
+        content = "on: push\njobs:\n  ~:\n    runs-on: ubuntu-latest\n    permissions: {bogus: read}\n"
+        errors = self.validator.validate_string(content)['errors']
+        self.assertEqual(finding_types(errors), {'InvalidScope'})
+        self.assertIn('for job "None"', errors[0]['message'])
+        workflow_errors = self.validator.validate_dict(dict(BASE, permissions={'bogus': 'read'}))['errors']
+        self.assertIn('for workflow', workflow_errors[0]['message'])
+
+    def test_lint_warnings(self):
         content = """
 name: Test
+on: push
 jobs:
   build:
-    runs-on: ubuntu-latest
+    runs-on: ubuntu-latest\t# Tab here (non-indent position)
     steps:
-      - run: echo hello
+      - run: echo "hello world"  # Even quotes
+      - run: "echo 'hello' with extra ' quote"  # Odd single quotes inside valid double-quoted scalar
 """
-        tmp_path = self.create_temp_yaml(content)
-        try:
-            result = self.validator.validate_file(tmp_path)
-            self.assertFalse(result['valid'])
-            self.assertGreater(len(result['errors']), 0)
-            self.assertEqual(result['errors'][0]['type'], 'MissingOn')
-        finally:
-            os.unlink(tmp_path)
-
-    def test_invalid_permissions(self):
-        content = """
+        result = self.validator.validate_string(content)
+        self.assertTrue(result['valid'])  # Syntax passes, warnings only
+        self.assertEqual(len(result['errors']), 0)
+        self.assertGreater(len(result['warnings']), 0)
+        self.assertLessEqual({'TabWarning', 'PossibleUnclosedString'}, finding_types(result['warnings']))
+
+    def test_line_stats(self):
+        content = """# CI workflow
 name: Test
+
 on: push
-permissions: invalid
 jobs:
   build:
+    # runner
     runs-on: ubuntu-latest
     steps:
       - run: echo hello
 """
-        tmp_path = self.create_temp_yaml(content)
-        try:
-            result = self.validator.validate_file(tmp_path)
-            self.assertFalse(result['valid'])
-            errors = [e['type'] for e in result['errors']]
-            self.assertIn('InvalidPermissionsType', errors)
-        finally:
-            os.unlink(tmp_path)
+        result = self.validator.validate_string(content)
+        self.assertEqual(result['stats'], {'total_lines': 10, 'empty_lines': 1, 'comment_lines': 2, 'code_lines': 7})
+        self.assertEqual(result['warnings'], [])
 
-    def test_lint_warnings(self):
+    def test_schema_phase_only(self):
         content = """
 name: Test
 on: push
 jobs:
   build:
-    runs-on: ubuntu-latest\t# Tab here (non-indent position)
+    runs-on: ubuntu-latest\t
     steps:
-      - run: echo "hello world"  # Even quotes
-      - run: "echo 'hello' with extra ' quote"  # Odd single quotes inside valid double-quoted scalar
+      - run: echo "hello
 """
-        tmp_path = self.create_temp_yaml(content)
-        try:
-            result = self.validator.validate_file(tmp_path)
-            self.assertTrue(result['valid'])  # Syntax passes, warnings only
-            self.assertEqual(len(result['errors']), 0)
-            self.assertGreater(len(result['warnings']), 0)
-            warning_types = [w['type'] for w in result['warnings']]
-            self.assertIn('TabWarning', warning_types)
-            self.assertIn('PossibleUnclosedString', warning_types)
-        finally:
-            os.unlink(tmp_path)
+        full = self.validator.validate_string(content)
+        fast = self.validator.validate_string(content, phase='schema')
+        self.assertGreater(len(full['warnings']), 0)
+        self.assertEqual(fast['valid'], full['valid'])
+        self.assertEqual(fast['errors'], full['errors'])
+        self.assertEqual(fast['structure'], full['structure'])
+        self.assertEqual(fast['warnings'], [])
+        self.assertEqual(fast['stats']['total_lines'], 0)
+        self.assertEqual(self.validator.validate_string(content, phase='fail-fast'), full)  # Valid: still linted
+        invalid = content.replace('runs-on', 'runs_on')
+        self.assertEqual(self.validator.validate_string(invalid, phase='fail-fast'),
+                         self.validator.validate_string(invalid, phase='schema'))
+
+    @unittest.skipIf(validator_module._scan_lines_njit() is None, "numba not installed")
+    def test_compiled_line_scan_matches_python(self):
+        content = b'# c\n\nname: "x\r\non: push\t\r  - run: it\'s\\\n  - run: "a" \'b\'\nlast'
+        python_stats = {'total_lines': 0, 'empty_lines': 0, 'comment_lines': 0, 'code_lines': 0}
+        compiled_stats = dict(python_stats)
+        python_warnings = self.validator._scan_lines(content, python_stats)
+        compiled_warnings = self.validator._scan_lines_compiled(content, compiled_stats)
+        self.assertEqual(compiled_stats, python_stats)
+        self.assertEqual(compiled_warnings, python_warnings)
 
     def test_empty_jobs_warning(self):
-        content = """
-name: Test
-on: push
-jobs:
-"""
-        tmp_path = self.create_temp_yaml(content)
-        try:
-            result = self.validator.validate_file(tmp_path)
-            self.assertTrue(result['valid'])  # Empty jobs is warning, not error
-            self.assertEqual(len(result['errors']), 0)
-            self.assertGreater(len(result['warnings']), 0)
-            self.assertEqual(result['warnings'][0]['type'], 'EmptyJobs')
-        finally:
-            os.unlink(tmp_path)
+        result = self.validator.validate_dict(dict(BASE, jobs=None))
+        self.assertTrue(result['valid'])  # Empty jobs is warning, not error
+        self.assertEqual(len(result['errors']), 0)
+        self.assertGreater(len(result['warnings']), 0)
+        self.assertEqual(result['warnings'][0]['type'], 'EmptyJobs')
 
     def test_batch_mode_valid(self):
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            dir_path = Path(tmp_dir)
-            file1 = dir_path / 'wf1.yml'
-            file2 = dir_path / 'wf2.yml'
-            file1.write_text("""
+        dir_path = self.create_temp_dir()
+        file1 = dir_path / 'wf1.yml'
+        file2 = dir_path / 'wf2.yml'
+        file1.write_text("""
 name: WF1
 on: push
 jobs:
@@ -154,7 +253,7 @@ jobs:
     steps:
       - run: echo
 """)
-            file2.write_text("""
+        file2.write_text("""
 name: WF2
 on: pull_request
 jobs:
@@ -163,46 +262,129 @@ jobs:
     steps:
       - run: echo
 """)
-            results = self.validator.validate_batch(str(dir_path))
-            self.assertEqual(len(results), 2)
-            self.assertTrue(all(r['valid'] for r in results.values()))
+        results = self.validator.validate_batch(str(dir_path))
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(r['valid'] for r in results.values()))
 
-    def test_batch_mode_empty(self):
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            results = self.validator.validate_batch(str(Path(tmp_dir) / '*.nonexistent'))
-            self.assertIn('no_files', results)
-            self.assertFalse(results['no_files']['valid'])
-            self.assertEqual(results['no_files']['errors'][0]['type'], 'NoFilesFound')
-
-    def test_main_exit_codes(self):
-        # Test CLI behavior indirectly via main
-        with tempfile.NamedTemporaryFile(suffix='.yml') as tmp:
-            tmp.write(b"""
-name: Test
+    def test_batch_mode_parallel_matches_serial(self):
+        dir_path = self.create_temp_dir()
+        for i in range(5):
+            (dir_path / f'wf{i}.yml').write_text(f"""
+name: WF{i}
 on: push
 jobs:
-  build:
+  job{i}:
     runs-on: ubuntu-latest
     steps:
-      - run: echo
-""")
-            tmp.flush()
-            sys_argv = sys.argv
-            sys.argv = ['prog', tmp.name]
-            try:
-                exit_code = main()
-                self.assertEqual(exit_code, 0)
-            finally:
-                sys.argv = sys_argv
+      - run: echo {i}
+""" if i % 2 else f"name: broken{i}\n")
+        serial = self.validator.validate_batch(str(dir_path), jobs=1)
+        parallel = YAMLValidator().validate_batch(str(dir_path), jobs=2)  # Fresh cache, so the pool runs
+        self.assertEqual(list(parallel), list(serial))
+        self.assertEqual(parallel, serial)
+        self.assertEqual(sum(r['valid'] for r in parallel.values()), 2)
+
+    def test_batch_mode_pool_unavailable_falls_back(self):
+        dir_path = self.create_temp_dir()
+        for i in range(3):
+            (dir_path / f'wf{i}.yml').write_text(yaml.safe_dump(dict(BASE, name=f'WF{i}')))
+        serial = self.validator.validate_batch(str(dir_path))
+        no_sem_open = NotImplementedError("This platform lacks a functioning sem_open implementation")
+        with mock.patch('concurrent.futures.ProcessPoolExecutor', side_effect=no_sem_open):
+            self.assertEqual(YAMLValidator().validate_batch(str(dir_path), jobs=2), serial)
+
+    def test_batch_mode_duplicate_contents(self):
+        dir_path = self.create_temp_dir()
+        (dir_path / 'a.yml').write_text(BASE_YAML)
+        (dir_path / 'b.yml').write_text(BASE_YAML)
+        results = self.validator.validate_batch(str(dir_path))
+        first, second = results.values()
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.validator._cache), 1)
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), "symlinks not supported")
+    def test_batch_mode_symlink_aliases(self):
+        dir_path = self.create_temp_dir()
+        (dir_path / 'wf.yml').write_text("name: Alias\non: push\njobs:\n  build:\n    runs-on: ubuntu-latest\n")
+        (dir_path / 'link.yml').symlink_to(dir_path / 'wf.yml')
+        (dir_path / 'a.yml').symlink_to(dir_path / 'wf.yml')  # Sorts ahead of the real file
+        real = Path(os.path.realpath(dir_path / 'wf.yml'))
+        results = self.validator.validate_batch(str(real.parent / '*.yml'))
+        self.assertEqual(list(results), [str(real)])
+
+    def test_batch_mode_empty(self):
+        results = self.validator.validate_batch(str(self.create_temp_dir() / '*.nonexistent'))
+        self.assertIn('no_files', results)
+        self.assertFalse(results['no_files']['valid'])
+        self.assertEqual(results['no_files']['errors'][0]['type'], 'NoFilesFound')
+
+    def test_print_json_round_trip(self):
+        result = self.validator.validate_file(Path(__file__).parent.parent / 'examples' / 'invalid-workflow.yml')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.validator.print_json(result)
+        self.assertEqual(json.loads(stdout.getvalue()), dict(result, version='1.0'))
+
+    def test_print_json_writes_utf8_bytes(self):
+        result = self.validator.validate_dict(dict(BASE, jobs={'bâtir': {'steps': []}}))
+        raw = io.BytesIO()
+        stdout = io.TextIOWrapper(raw, encoding='ascii')
+        with contextlib.redirect_stdout(stdout):
+            print("Processing...")
+            self.validator.print_json(result)
+        stdout.flush()
+        header, _, body = raw.getvalue().partition(b'\n')
+        self.assertEqual(header, b'Processing...')
+        self.assertIn('bâtir'.encode('utf-8'), body)
+        self.assertEqual(json.loads(body), dict(result, version='1.0'))
+
+    def test_json_encoders_agree_on_non_string_job_ids(self):
+        for job_id in ['1', '2001-12-14', '2001-12-14T21:59:43.10Z', '100000000000000000000', '.inf', '.nan']:
+            with self.subTest(job_id):
+                result = self.validator.validate_string(f"on: push\njobs:\n  {job_id}:\n    runs-on: ubuntu-latest\n")
+                with mock.patch.dict('sys.modules', {'orjson': None}):  # Blocks the import: stdlib path
+                    stdlib = validator_module._dump_json(result)
+                self.assertNotIn(b'NaN', stdlib)  # Non-finite floats become null, not NaN/Infinity
+                self.assertNotIn(b'Infinity', stdlib)
+                try:
+                    import orjson  # noqa: F401
+                except ImportError:
+                    continue
+                self.assertEqual(validator_module._dump_json(result), stdlib)
+
+    def test_github_actions_annotations(self):
+        result = {
+            'valid': False,
+            'errors': [{'line': 0, 'type': 'MissingOn', 'message': 'Required "on" trigger missing', 'severity': 'ERROR'}],
+            'warnings': [{'line': 7, 'type': 'TabWarning', 'message': 'Tab character found'}],
+        }
+        stderr = io.StringIO()
+        with mock.patch.dict(os.environ, {'GITHUB_ACTIONS': 'true'}), \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+            self.validator.print_json({'files': {'a.yml': result}, 'overall_valid': False})
+        self.assertEqual(stderr.getvalue().splitlines(), [
+            '::error file=a.yml,line=1::MissingOn: Required "on" trigger missing',
+            '::warning file=a.yml,line=7::TabWarning: Tab character found',
+        ])
+
+    def test_main_exit_codes(self):
+        # Test CLI behavior indirectly via main
+        tmp_path = self.create_temp_yaml(BASE_YAML)
+        self.assertEqual(main([tmp_path]), 0)
 
         # Invalid file
-        sys_argv = sys.argv
-        sys.argv = ['prog', 'nonexistent.yml']
-        try:
-            exit_code = main()
-            self.assertEqual(exit_code, 1)
-        finally:
-            sys.argv = sys_argv
+        self.assertEqual(main(['nonexistent.yml']), 1)
+
+    def test_main_batch_mode(self):
+        dir_path = self.create_temp_dir()
+        (dir_path / 'ok.yml').write_text(BASE_YAML)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(['--batch', str(dir_path)]), 0)
+            (dir_path / 'bad.yml').write_text(yaml.safe_dump(dict(BASE, permissions='invalid')))
+            self.assertEqual(main(['--batch', str(dir_path), '--json']), 1)
+            self.assertEqual(main(['--batch']), 1)
+            self.assertEqual(main([str(dir_path / 'ok.yml'), '--jobs', '2']), 1)  # --jobs needs --batch
 
 if __name__ == '__main__':
     unittest.main()